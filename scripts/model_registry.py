@@ -0,0 +1,217 @@
+import json
+import os
+import shutil
+from datetime import datetime
+import joblib
+from nearest_beams import refresh_neighbor_index
+from predict import invalidate_prediction_caches
+
+# Shared by ModelVersionManager and the script-style training entry points so
+# every path reads and writes model_versions.json the same way.
+
+
+def initialize_versions(versions_file):
+    """Initialize the versions tracking file"""
+    versions = {
+        "current_version": "v1.0.0",
+        "versions": {
+            "v1.0.0": {
+                "version": "v1.0.0",
+                "created_at": datetime.now().isoformat(),
+                "training_samples": 978,
+                "additional_samples": 0,
+                "r2_score": 0.794,
+                "oob_score": 0.794,
+                "description": "Original model trained on 978 samples",
+                "status": "active"
+            }
+        }
+    }
+    save_versions(versions_file, versions)
+
+
+def load_versions(versions_file):
+    """Read the versions tracking file"""
+    with open(versions_file, 'r') as f:
+        return json.load(f)
+
+
+def save_versions(versions_file, versions):
+    """Write the versions tracking file atomically so readers never see a partial pointer"""
+    tmp_path = f"{versions_file}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(versions, f, indent=2)
+    os.replace(tmp_path, versions_file)
+
+
+def resolve_artifact(versions_file, artifact):
+    """Artifacts are recorded relative to the data directory holding the versions file"""
+    return os.path.join(os.path.dirname(versions_file), artifact)
+
+
+def current_artifact_path(versions_file, current_model_path):
+    """Artifact of the version the current_version pointer refers to"""
+    if not os.path.exists(versions_file):
+        return current_model_path
+    versions = load_versions(versions_file)
+    info = versions["versions"].get(versions["current_version"], {})
+    if info.get("artifact"):
+        return resolve_artifact(versions_file, info["artifact"])
+    return current_model_path
+
+
+def create_backup(current_model_path, versions_dir, version_name=None):
+    """Copy the current model to model_versions/ under a timestamped version name"""
+    if not os.path.exists(current_model_path):
+        print("❌ No current model to backup")
+        return None
+
+    if not version_name:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        version_name = f"v1.0.{timestamp}"
+
+    backup_path = os.path.join(versions_dir, f"{version_name}.pkl")
+    shutil.copy2(current_model_path, backup_path)
+
+    print(f"✅ Model backed up as {version_name}")
+    return version_name
+
+
+def unique_version_name(versions_file, versions_dir, version_name):
+    """
+    Return version_name, or version_name with a numeric suffix if it is already taken
+
+    Retrain versions are named after their additional sample count, so two
+    retrains on the same count would otherwise share a name and artifact.
+    """
+    taken = set(load_versions(versions_file)["versions"]) if os.path.exists(versions_file) else set()
+    candidate = version_name
+    suffix = 1
+    while candidate in taken or os.path.exists(os.path.join(versions_dir, f"{candidate}.pkl")):
+        candidate = f"{version_name}.{suffix}"
+        suffix += 1
+    return candidate
+
+
+def store_artifact(versions_dir, version_name, model_data, original_data=None, additional_data=None):
+    """
+    Keep a servable copy of a registered version under model_versions/ with its nearest-beam index
+
+    Stored artifacts are never replaced, so rolling back to a version always
+    restores the model it was registered with.
+    """
+    artifact_path = os.path.join(versions_dir, f"{version_name}.pkl")
+    if os.path.exists(artifact_path):
+        raise FileExistsError(f"Artifact for {version_name} already exists; refusing to overwrite it")
+    joblib.dump(model_data, artifact_path)
+    refresh_neighbor_index(artifact_path, original_data, additional_data)
+    return f"model_versions/{version_name}.pkl"
+
+
+def update_versions(versions_file, new_version, model_data, additional_data, versions_dir, shadow=False,
+                    original_data=None):
+    """
+    Store the new model's artifact and register it as the active version or a shadow candidate
+
+    Pass the original samples the model was trained on to index them without
+    re-reading Inputs.xlsx.
+    """
+    artifact = store_artifact(versions_dir, new_version, model_data, original_data, additional_data)
+
+    versions = load_versions(versions_file)
+
+    if shadow:
+        description = f"Shadow candidate retrained with {len(additional_data)} additional samples"
+        status = "shadow"
+        shadow_versions = versions.setdefault("shadow_versions", [])
+        if new_version not in shadow_versions:
+            shadow_versions.append(new_version)
+    else:
+        description = f"Retrained with {len(additional_data)} additional samples"
+        status = "active"
+        # Mark current version as inactive
+        if versions["current_version"] in versions["versions"]:
+            versions["versions"][versions["current_version"]]["status"] = "inactive"
+        versions["current_version"] = new_version
+
+    versions["versions"][new_version] = {
+        "version": new_version,
+        "created_at": model_data["created_at"],
+        "training_samples": model_data["training_samples"],
+        "additional_samples": model_data["additional_samples"],
+        "r2_score": model_data["r2_score"],
+        "oob_score": model_data["oob_score"],
+        "description": description,
+        "artifact": artifact,
+        "status": status
+    }
+
+    save_versions(versions_file, versions)
+
+
+def switch_current_version(versions_file, versions, version_name):
+    """Point current_version at a registered version and invalidate cached state"""
+    if versions["current_version"] in versions["versions"]:
+        versions["versions"][versions["current_version"]]["status"] = "inactive"
+    versions["versions"][version_name]["status"] = "active"
+    versions["current_version"] = version_name
+    versions["shadow_versions"] = [v for v in versions.get("shadow_versions", []) if v != version_name]
+    versions["updated_at"] = datetime.now().isoformat()
+    save_versions(versions_file, versions)
+
+    # Serving processes reload the registry when the file changes; drop this process's caches too
+    invalidate_prediction_caches()
+
+
+def register_backup(versions_file, versions, version_name):
+    """Record a timestamped backup under model_versions/ as a version the pointer can move to"""
+    artifact = f"model_versions/{version_name}.pkl"
+    artifact_path = resolve_artifact(versions_file, artifact)
+    if not os.path.exists(artifact_path):
+        return False
+
+    if version_name in versions["versions"]:
+        # Known version whose artifact was never recorded; keep its metadata
+        versions["versions"][version_name]["artifact"] = artifact
+        refresh_neighbor_index(artifact_path)
+        return True
+
+    model_data = joblib.load(artifact_path)
+    versions["versions"][version_name] = {
+        "version": version_name,
+        "created_at": model_data.get("created_at", datetime.fromtimestamp(os.path.getmtime(artifact_path)).isoformat()),
+        "training_samples": model_data.get("training_samples", 978),
+        "additional_samples": model_data.get("additional_samples", 0),
+        "r2_score": model_data.get("r2_score", 0.794),
+        "oob_score": model_data.get("oob_score", 0.794),
+        "description": f"Backup of {model_data.get('version', 'an unversioned model')} taken before retraining",
+        "artifact": artifact,
+        "status": "inactive"
+    }
+    refresh_neighbor_index(artifact_path)
+    return True
+
+
+def rollback_to_version(versions_file, version_name):
+    """
+    Restore a version by moving the current_version pointer to its stored artifact
+
+    Timestamped backups that were never registered are registered first, so
+    every successful rollback changes what is served.
+    """
+    if not version_name:
+        return False
+
+    versions = load_versions(versions_file)
+    info = versions["versions"].get(version_name)
+    if info and info.get("artifact"):
+        if not os.path.exists(resolve_artifact(versions_file, info["artifact"])):
+            print(f"❌ Stored artifact for {version_name} is missing")
+            return False
+    elif not register_backup(versions_file, versions, version_name):
+        print(f"❌ Version {version_name} not found")
+        return False
+
+    switch_current_version(versions_file, versions, version_name)
+    print(f"✅ Rolled back to {version_name}")
+    return True
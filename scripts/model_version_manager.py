@@ -5,6 +5,15 @@ import os
 import shutil
 from datetime import datetime
 import json
+from nearest_beams import flag_near_duplicates, neighbor_index_path
+from training_policy import apply_training_policy, training_n_jobs
+from predict import summarize_shadow_scores
+import model_registry
+
+# A shadow candidate needs this many live comparisons before it can be promoted
+MIN_SHADOW_SAMPLES = 50
+# ...and may not drift further than this from the active model on average
+MAX_SHADOW_REL_DIFF = 0.15
 
 class ModelVersionManager:
     def __init__(self):
@@ -18,52 +27,80 @@ class ModelVersionManager:
         # Initialize versions file if it doesn't exist
         if not os.path.exists(self.versions_file):
             self.initialize_versions()
+        
+        self.register_current_artifact()
     
     def initialize_versions(self):
         """Initialize the versions tracking file"""
-        versions = {
-            "current_version": "v1.0.0",
-            "versions": {
-                "v1.0.0": {
-                    "version": "v1.0.0",
-                    "created_at": datetime.now().isoformat(),
-                    "training_samples": 978,
-                    "additional_samples": 0,
-                    "r2_score": 0.794,
-                    "oob_score": 0.794,
-                    "description": "Original model trained on 978 samples",
-                    "status": "active"
-                }
-            }
-        }
-        
-        with open(self.versions_file, 'w') as f:
-            json.dump(versions, f, indent=2)
+        model_registry.initialize_versions(self.versions_file)
     
-    def create_backup(self, version_name=None):
-        """Create a backup of the current model"""
-        if not os.path.exists(self.current_model_path):
-            print("❌ No current model to backup")
-            return False
+    def load_versions(self):
+        """Read the versions tracking file"""
+        return model_registry.load_versions(self.versions_file)
+    
+    def save_versions(self, versions):
+        """Write the versions tracking file atomically"""
+        model_registry.save_versions(self.versions_file, versions)
+    
+    def register_current_artifact(self):
+        """Store MLBeam_model.pkl as the current version's artifact if it has none yet"""
+        versions = self.load_versions()
+        current = versions["current_version"]
+        info = versions["versions"].get(current)
+        if not info or info.get("artifact") or not os.path.exists(self.current_model_path):
+            return
         
-        if not version_name:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            version_name = f"v1.0.{timestamp}"
+        # Older retrains and backup restores rewrote MLBeam_model.pkl without updating
+        # the versions file, so only adopt it if it really is the current version.
+        # Unversioned pickles count as v1.0.0 only if they carry no additional samples.
+        model_data = joblib.load(self.current_model_path)
+        model_version = model_data.get("version")
+        if model_version is None and not model_data.get("additional_samples"):
+            model_version = "v1.0.0"
+        if model_version != current:
+            print(f"⚠️  MLBeam_model.pkl holds {model_version or 'an unversioned retrained model'}, "
+                  f"not {current}; not registering it as {current}")
+            return
         
-        backup_path = os.path.join(self.versions_dir, f"{version_name}.pkl")
-        shutil.copy2(self.current_model_path, backup_path)
+        artifact_path = os.path.join(self.versions_dir, f"{current}.pkl")
+        shutil.copy2(self.current_model_path, artifact_path)
+        index_path = neighbor_index_path(self.current_model_path)
+        if os.path.exists(index_path):
+            shutil.copy2(index_path, neighbor_index_path(artifact_path))
         
-        print(f"✅ Model backed up as {version_name}")
-        return version_name
+        info["artifact"] = f"model_versions/{current}.pkl"
+        self.save_versions(versions)
+    
+    def current_artifact_path(self):
+        """Artifact of the version the current_version pointer refers to"""
+        return model_registry.current_artifact_path(self.versions_file, self.current_model_path)
+    
+    def create_backup(self, version_name=None):
+        """Create a backup of the current model"""
+        return model_registry.create_backup(self.current_artifact_path(), self.versions_dir, version_name) or False
     
-    def retrain_with_validation(self, additional_data):
-        """Retrain model with validation and rollback capability"""
+    def retrain_with_validation(self, additional_data, shadow=False, n_jobs=None):
+        """
+        Retrain model with validation and rollback capability
+        
+        With shadow=True a model that passes validation is registered as a
+        shadow candidate instead of replacing the current model; it is scored
+        against live traffic and promoted later with promote_version.
+        """
         print("Starting model retraining with validation...")
         
+        # Keep training off the cores reserved for prediction serving. Priority, affinity
+        # and memory limits are applied by `python model_version_manager.py retrain`;
+        # other callers keep their own process settings and only get the worker cap.
+        n_jobs = n_jobs or training_n_jobs()
+        
         # Create backup before retraining
-        backup_version = self.create_backup()
+        self.create_backup()
         
         try:
+            # Flag submissions that repeat an already tested beam
+            flag_near_duplicates(additional_data, self.current_artifact_path())
+            
             # Load original data
             original_data = pd.read_excel('../../Inputs.xlsx')
             print(f"📊 Original training data: {len(original_data)} samples")
@@ -103,7 +140,7 @@ class ModelVersionManager:
                 min_samples_leaf=1,
                 random_state=43,
                 oob_score=True,
-                n_jobs=-1
+                n_jobs=n_jobs
             )
             model.fit(X_train, y_train)
             
@@ -120,7 +157,7 @@ class ModelVersionManager:
             print(f"   Out-of-bag Score: {model.oob_score_:.4f}")
             
             # Load current model for comparison
-            current_model_data = joblib.load(self.current_model_path)
+            current_model_data = joblib.load(self.current_artifact_path())
             current_r2 = current_model_data.get('r2_score', 0.794)
             current_oob = current_model_data.get('oob_score', 0.794)
             
@@ -140,7 +177,8 @@ class ModelVersionManager:
             
             if r2_improvement >= improvement_threshold or oob_improvement >= improvement_threshold:
                 # New model is better, save it
-                new_version = f"v1.1.{len(additional_data)}"
+                new_version = model_registry.unique_version_name(self.versions_file, self.versions_dir,
+                                                                  f"v1.1.{len(additional_data)}")
                 
                 model_data = {
                     'model': model,
@@ -154,10 +192,16 @@ class ModelVersionManager:
                     'created_at': datetime.now().isoformat()
                 }
                 
-                joblib.dump(model_data, self.current_model_path)
+                if shadow:
+                    # Serve alongside the current model until shadow scores justify promotion
+                    self.update_versions(new_version, model_data, additional_data, shadow=True,
+                                         original_data=original_data)
+                    print(f"✅ New model registered as shadow candidate {new_version}")
+                    return True
                 
-                # Update versions tracking
-                self.update_versions(new_version, model_data, additional_data)
+                # Serving reads the stored artifact through the version pointer, so
+                # MLBeam_model.pkl stays the bootstrap model and is not rewritten
+                self.update_versions(new_version, model_data, additional_data, original_data=original_data)
                 
                 print(f"✅ New model saved as {new_version}")
                 print(f"🎉 Model retraining successful with improved performance!")
@@ -168,64 +212,82 @@ class ModelVersionManager:
                 return False
                 
         except Exception as e:
+            # Nothing on this path touches the served artifact or the version
+            # pointer, so the current model stays in place; the backup is only
+            # registered if someone explicitly rolls back to it.
             print(f"❌ Error during retraining: {e}")
-            print(f"Rolling back to previous version...")
-            self.rollback_to_version(backup_version)
+            print(f"Keeping current model")
             return False
     
     def rollback_to_version(self, version_name):
-        """Rollback to a previous model version"""
-        backup_path = os.path.join(self.versions_dir, f"{version_name}.pkl")
-        
-        if os.path.exists(backup_path):
-            shutil.copy2(backup_path, self.current_model_path)
-            print(f"✅ Rolled back to {version_name}")
-            return True
-        else:
-            print(f"❌ Version {version_name} not found")
-            return False
+        """
+        Rollback to a previous model version
+        
+        Moves the current_version pointer to the version's stored artifact;
+        no model is copied or retrained and no training data is touched.
+        """
+        return model_registry.rollback_to_version(self.versions_file, version_name)
+    
+    def switch_current_version(self, versions, version_name):
+        """Point current_version at a registered version and invalidate cached state"""
+        model_registry.switch_current_version(self.versions_file, versions, version_name)
     
-    def update_versions(self, new_version, model_data, additional_data):
+    def update_versions(self, new_version, model_data, additional_data, shadow=False, original_data=None):
         """Update the versions tracking file"""
-        with open(self.versions_file, 'r') as f:
-            versions = json.load(f)
-        
-        # Mark current version as inactive
-        if versions["current_version"] in versions["versions"]:
-            versions["versions"][versions["current_version"]]["status"] = "inactive"
-        
-        # Add new version
-        versions["versions"][new_version] = {
-            "version": new_version,
-            "created_at": model_data["created_at"],
-            "training_samples": model_data["training_samples"],
-            "additional_samples": model_data["additional_samples"],
-            "r2_score": model_data["r2_score"],
-            "oob_score": model_data["oob_score"],
-            "description": f"Retrained with {len(additional_data)} additional samples",
-            "status": "active"
-        }
-        
-        versions["current_version"] = new_version
-        
-        with open(self.versions_file, 'w') as f:
-            json.dump(versions, f, indent=2)
+        model_registry.update_versions(self.versions_file, new_version, model_data, additional_data,
+                                       self.versions_dir, shadow=shadow, original_data=original_data)
+    
+    def promote_version(self, version_name, force=False):
+        """Promote a shadow candidate once its live comparison looks safe"""
+        versions = self.load_versions()
+        
+        info = versions["versions"].get(version_name)
+        if not info or not info.get("artifact"):
+            print(f"❌ Version {version_name} has no stored artifact")
+            return False
+        
+        summary = summarize_shadow_scores(version_name, versions["current_version"])
+        if summary:
+            print(f"📊 Shadow comparison vs {versions['current_version']}:")
+            print(f"   Samples: {summary['samples']}")
+            print(f"   Mean diff: {summary['mean_diff_kn']:+.3f} kN")
+            print(f"   Mean |diff|: {summary['mean_abs_diff_kn']:.3f} kN")
+            print(f"   Max |diff|: {summary['max_abs_diff_kn']:.3f} kN")
+            print(f"   Mean relative diff: {summary['mean_rel_diff']:.2%}")
+        
+        if not force:
+            if not summary or summary['samples'] < MIN_SHADOW_SAMPLES:
+                print(f"⚠️  Not enough shadow traffic to promote {version_name} (need {MIN_SHADOW_SAMPLES} samples)")
+                return False
+            if summary['mean_rel_diff'] > MAX_SHADOW_REL_DIFF:
+                print(f"⚠️  {version_name} drifts too far from the active model; keeping current model")
+                return False
+        
+        self.switch_current_version(versions, version_name)
+        
+        print(f"✅ Promoted {version_name} to active")
+        return True
     
     def list_versions(self):
         """List all available model versions"""
-        with open(self.versions_file, 'r') as f:
-            versions = json.load(f)
+        versions = self.load_versions()
         
         print("📋 Available Model Versions:")
         for version, info in versions["versions"].items():
-            status = "🟢 ACTIVE" if info["status"] == "active" else "⚪ Inactive"
+            if info["status"] == "active":
+                status = "🟢 ACTIVE"
+            elif info["status"] == "shadow":
+                status = "🟡 Shadow"
+            else:
+                status = "⚪ Inactive"
             print(f"   {version}: {info['description']} - {status}")
             print(f"      Samples: {info['training_samples']}, R²: {info['r2_score']:.4f}")
     
     def get_current_model_info(self):
         """Get information about the current model"""
-        if os.path.exists(self.current_model_path):
-            model_data = joblib.load(self.current_model_path)
+        model_path = self.current_artifact_path()
+        if os.path.exists(model_path):
+            model_data = joblib.load(model_path)
             return {
                 "version": model_data.get("version", "v1.0.0"),
                 "training_samples": model_data.get("training_samples", 978),
@@ -235,5 +297,29 @@ class ModelVersionManager:
         return None
 
 if __name__ == '__main__':
+    import sys
+    
+    # python model_version_manager.py                         list versions
+    # python model_version_manager.py retrain [--shadow]      retrain on additional_training_data.json
+    # python model_version_manager.py promote <v> [--force]   promote a shadow candidate
+    # python model_version_manager.py rollback <v>            move current_version to <v>
     manager = ModelVersionManager()
-    manager.list_versions()
+    if len(sys.argv) > 1 and sys.argv[1] == 'retrain':
+        additional_data_path = '../data/additional_training_data.json'
+        additional_data = []
+        if os.path.exists(additional_data_path):
+            with open(additional_data_path, 'r') as f:
+                additional_data = json.load(f)
+        if not additional_data:
+            print("❌ No additional data to retrain with")
+            sys.exit(1)
+        # Lower this process's priority and pin it before training
+        success = manager.retrain_with_validation(additional_data, shadow='--shadow' in sys.argv,
+                                                  n_jobs=apply_training_policy())
+        sys.exit(0 if success else 1)
+    elif len(sys.argv) > 2 and sys.argv[1] == 'promote':
+        manager.promote_version(sys.argv[2], force='--force' in sys.argv)
+    elif len(sys.argv) > 2 and sys.argv[1] == 'rollback':
+        sys.exit(0 if manager.rollback_to_version(sys.argv[2]) else 1)
+    else:
+        manager.list_versions()
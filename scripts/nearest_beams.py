@@ -0,0 +1,223 @@
+import sys
+import json
+import os
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.neighbors import KDTree
+
+from predict import FEATURE_NAMES, SCRIPT_DIR, DEFAULT_MODEL_PATH
+
+INPUTS_PATH = os.path.join(SCRIPT_DIR, '..', '..', 'Inputs.xlsx')
+ADDITIONAL_DATA_PATH = os.path.join(SCRIPT_DIR, '..', 'data', 'additional_training_data.json')
+
+# Distance in standardized feature space below which two beams are treated as the same test
+DUPLICATE_DISTANCE = 0.05
+
+_index_cache = {}
+
+
+def neighbor_index_path(model_path=DEFAULT_MODEL_PATH):
+    """The index is persisted beside its artifact, e.g. MLBeam_model.neighbors.pkl"""
+    root, _ = os.path.splitext(model_path)
+    return f"{root}.neighbors.pkl"
+
+
+def build_neighbor_index(model_path=DEFAULT_MODEL_PATH, original_data=None, additional_data=None,
+                         inputs_path=INPUTS_PATH, additional_data_path=ADDITIONAL_DATA_PATH):
+    """
+    Build a KD-tree over the tested beams in the model's standardized feature space
+
+    Training code passes the original and additional samples it fitted on so
+    the index holds exactly the model's training set. Otherwise they are read
+    from disk, keeping only as many additional samples as the model recorded.
+    """
+    model_data = joblib.load(model_path)
+    mu = np.asarray(model_data['mu'], dtype=float)
+    sigma = np.asarray(model_data['sigma'], dtype=float)
+
+    if original_data is None:
+        original_data = pd.read_excel(inputs_path)
+    original_data = original_data.copy()
+    original_data['source'] = 'Inputs.xlsx'
+
+    if additional_data is None:
+        additional_data = []
+        if os.path.exists(additional_data_path):
+            with open(additional_data_path, 'r') as f:
+                additional_data = json.load(f)
+        # Samples appended after this model was trained are not part of it
+        additional_data = additional_data[:model_data.get('additional_samples', 0)]
+    additional_df = pd.DataFrame(additional_data)
+    additional_df['source'] = 'additional_training_data.json'
+
+    combined_data = pd.concat([original_data, additional_df], ignore_index=True)
+
+    X = combined_data[FEATURE_NAMES].values.astype(float)
+    records = []
+    for _, row in combined_data.iterrows():
+        record = {name: float(row[name]) for name in FEATURE_NAMES}
+        record['V_Kn'] = float(row['V_Kn'])
+        record['source'] = row['source']
+        if 'Beam_Number' in row and pd.notna(row['Beam_Number']):
+            record['Beam_Number'] = int(row['Beam_Number'])
+        records.append(record)
+
+    index = {
+        'tree': KDTree((X - mu) / sigma),
+        'records': records,
+        'mu': mu,
+        'sigma': sigma,
+        'version': model_data.get('version', 'v1.0.0'),
+        'original_samples': len(original_data),
+        'additional_samples': len(additional_data)
+    }
+
+    index_path = neighbor_index_path(model_path)
+    joblib.dump(index, index_path)
+    _index_cache.pop(index_path, None)
+    print(f"✅ Nearest-beam index built with {len(records)} samples at {index_path}")
+    return index
+
+
+def refresh_neighbor_index(model_path=DEFAULT_MODEL_PATH, original_data=None, additional_data=None):
+    """Rebuild the index after training; a failure here must not undo a saved model"""
+    try:
+        return build_neighbor_index(model_path, original_data, additional_data)
+    except Exception as e:
+        print(f"⚠️  Could not build nearest-beam index: {e}")
+        return None
+
+
+def load_neighbor_index(model_path=DEFAULT_MODEL_PATH):
+    """Load the persisted index once per process; None if it has not been built"""
+    index_path = neighbor_index_path(model_path)
+    if not os.path.exists(index_path):
+        return None
+
+    mtime = os.path.getmtime(index_path)
+    cached = _index_cache.get(index_path)
+    if cached is None or cached[0] != mtime:
+        _index_cache[index_path] = (mtime, joblib.load(index_path))
+    return _index_cache[index_path][1]
+
+
+def index_for_engine(engine):
+    """The index beside an engine's artifact, or None if missing or built for another model version"""
+    index = load_neighbor_index(engine.model_path)
+    if index is None or index['version'] != engine.load_model().get('version', 'v1.0.0'):
+        return None
+    return index
+
+
+def load_current_neighbor_index():
+    """Resolve the served version through the current_version pointer and load its index"""
+    from predict import ModelServer
+
+    _, engine = ModelServer(shadow_sample_rate=0).get_engine()
+    if engine is None or not os.path.exists(engine.model_path):
+        return None
+    return index_for_engine(engine)
+
+
+def find_nearest_beams(input_data, k=5, index=None, model_path=DEFAULT_MODEL_PATH):
+    """
+    Return the k most similar tested beams and their standardized distances
+
+    Args:
+        input_data: Dictionary containing beam parameters
+        k: Number of neighbours to return
+        index: A loaded index, or None to load the one beside model_path
+
+    Returns:
+        List of tested-beam dictionaries with a 'distance' key, nearest first
+    """
+    if index is None:
+        index = load_neighbor_index(model_path)
+    if index is None:
+        return []
+
+    features = np.array([float(input_data[name]) for name in FEATURE_NAMES])
+    standardized = (features - index['mu']) / index['sigma']
+
+    k = min(k, len(index['records']))
+    distances, indices = index['tree'].query([standardized], k=k)
+
+    neighbors = []
+    for distance, i in zip(distances[0], indices[0]):
+        neighbor = dict(index['records'][i])
+        neighbor['distance'] = float(distance)
+        neighbors.append(neighbor)
+    return neighbors
+
+
+def check_near_duplicate(beam_data, index=None, model_path=DEFAULT_MODEL_PATH,
+                         threshold=DUPLICATE_DISTANCE):
+    """Return (is_duplicate, nearest) for a submitted beam against the tested beams"""
+    nearest = find_nearest_beams(beam_data, k=1, index=index, model_path=model_path)
+    if not nearest:
+        return False, None
+    return nearest[0]['distance'] < threshold, nearest[0]
+
+
+def flag_near_duplicates(additional_data, model_path=DEFAULT_MODEL_PATH):
+    """Print a warning for each additional sample that is not yet indexed and duplicates a tested beam"""
+    index = load_neighbor_index(model_path)
+    if index is None:
+        return []
+
+    flagged = []
+    new_samples = additional_data[index['additional_samples']:]
+    for sample in new_samples:
+        try:
+            is_duplicate, nearest = check_near_duplicate(sample, index=index)
+        except (KeyError, TypeError, ValueError):
+            continue
+        if is_duplicate:
+            flagged.append(sample)
+            print(f"⚠️  Near-duplicate sample {sample.get('Beam_Number', '?')}: "
+                  f"distance {nearest['distance']:.4f} to tested beam "
+                  f"{nearest.get('Beam_Number', '?')} ({nearest['source']})")
+    return flagged
+
+
+if __name__ == '__main__':
+    # python nearest_beams.py --build       rebuild the index for the current version
+    # python nearest_beams.py [k] < beams   print the nearest tested beams as JSON;
+    #                                       stdin is one beam or a list of beams
+    try:
+        if len(sys.argv) > 1 and sys.argv[1] == '--build':
+            from predict import ModelServer
+
+            _, engine = ModelServer(shadow_sample_rate=0).get_engine()
+            build_neighbor_index(engine.model_path)
+        else:
+            k = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+            beams = json.loads(sys.stdin.read())
+            index = load_current_neighbor_index()
+
+            results = []
+            for beam_data in (beams if isinstance(beams, list) else [beams]):
+                if index is None:
+                    results.append({'nearestBeams': [], 'isNearDuplicate': False})
+                    continue
+                try:
+                    nearest = find_nearest_beams(beam_data, k=k, index=index)
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    # One malformed submission must not drop the annotations of the others
+                    nearest = []
+                results.append({
+                    'nearestBeams': nearest,
+                    'isNearDuplicate': bool(nearest) and nearest[0]['distance'] < DUPLICATE_DISTANCE
+                })
+
+            if isinstance(beams, list):
+                print(json.dumps({'success': True, 'results': results}))
+            else:
+                print(json.dumps({'success': True, **results[0]}))
+
+    except Exception as e:
+        print(json.dumps({
+            'error': f'Nearest beam lookup failed: {str(e)}',
+            'success': False
+        }))
@@ -3,75 +3,383 @@ import json
 import numpy as np
 import joblib
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def predict_beam_strength(input_data):
-    """
-    Predict beam shear strength using the trained ML model
-    
-    Args:
-        input_data: Dictionary containing beam parameters
-        
-    Returns:
-        Dictionary with prediction results
-    """
+# Define feature names in the correct order
+FEATURE_NAMES = ['h_mm', 'd_mm', 'b_mm', 'a_mm', 'abyd', 'fck_Mpa',
+                 'rho', 'fyk_Mpa', 'da_mm', 'Plate_Top_mm', 'Plate_Bottom_mm']
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODEL_PATH = os.path.join(SCRIPT_DIR, 'MLBeam_model.pkl')
+DATA_DIR = os.path.join(SCRIPT_DIR, '..', 'data')
+DEFAULT_CAPTURE_PATH = os.path.join(DATA_DIR, 'traffic_capture.jsonl')
+DEFAULT_VERSIONS_FILE = os.path.join(DATA_DIR, 'model_versions.json')
+SHADOW_SCORES_PATH = os.path.join(DATA_DIR, 'shadow_scores.jsonl')
+
+# Fraction of live requests also scored by shadow candidates (BEAM_SHADOW_SAMPLE_RATE)
+DEFAULT_SHADOW_SAMPLE_RATE = 0.1
+# Shadow requests allowed to wait for a worker; beyond this new samples are dropped
+MAX_PENDING_SHADOW = 32
+
+# Bumped by invalidate_prediction_caches so servers in this process drop loaded models
+_cache_generation = 0
+
+
+def invalidate_prediction_caches():
+    """Drop loaded models and nearest-beam indexes held by this process"""
+    global _cache_generation
+    _cache_generation += 1
     try:
-        # Get the directory where this script is located
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(script_dir, 'MLBeam_model.pkl')
-        
+        from nearest_beams import _index_cache
+        _index_cache.clear()
+    except ImportError:
+        pass
+
+
+class PredictionEngine:
+    """Holds a loaded model artifact and serves predictions from it"""
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH):
+        self.model_path = model_path
+        self.model_data = None
+
+    def load_model(self):
+        """Load the model artifact once and keep it in memory"""
+        if self.model_data is None:
+            self.model_data = joblib.load(self.model_path)
+        return self.model_data
+
+    def extract_features(self, input_data):
+        """Return the feature vector in model order, or an error message"""
+        features = []
+        for name in FEATURE_NAMES:
+            if name not in input_data:
+                return None, f'Missing required parameter: {name}'
+            features.append(float(input_data[name]))
+        return np.array(features), None
+
+    def predict(self, input_data):
+        """
+        Predict beam shear strength for a single input
+
+        Args:
+            input_data: Dictionary containing beam parameters
+
+        Returns:
+            Dictionary with prediction results
+        """
         # Check if model file exists
-        if not os.path.exists(model_path):
+        if not os.path.exists(self.model_path):
             return {
                 'error': 'Model file not found. Please ensure MLBeam_model.pkl is in the project root.',
                 'success': False
             }
-        
+
         # Load the trained model
-        data = joblib.load(model_path)
+        data = self.load_model()
         model = data['model']
         mu = data['mu']
         sigma = data['sigma']
-        
-        # Define feature names in the correct order
-        feature_names = ['h_mm', 'd_mm', 'b_mm', 'a_mm', 'abyd', 'fck_Mpa',
-                        'rho', 'fyk_Mpa', 'da_mm', 'Plate_Top_mm', 'Plate_Bottom_mm']
-        
+
         # Extract features in the correct order
-        features = []
-        for name in feature_names:
-            if name not in input_data:
-                return {
-                    'error': f'Missing required parameter: {name}',
-                    'success': False
-                }
-            features.append(float(input_data[name]))
-        
-        # Convert to numpy array
-        features = np.array(features)
-        
+        features, error = self.extract_features(input_data)
+        if error:
+            return {
+                'error': error,
+                'success': False
+            }
+
         # Check dimension match
         if features.shape[0] != len(mu):
             return {
                 'error': 'Input dimension mismatch with model',
                 'success': False
             }
-        
+
         # Standardize the input
         standardized = (features - mu) / sigma
-        
+
         # Make prediction
         prediction = model.predict([standardized])[0]
-        
+
         # Calculate confidence (using out-of-bag score if available)
         confidence = getattr(model, 'oob_score_', 0.85)  # Default confidence if oob_score not available
-        
+
         return {
             'success': True,
             'shearStrength': float(prediction),
             'confidence': float(confidence),
             'inputData': input_data
         }
-        
+
+
+class ModelServer:
+    """
+    Serves every registered model version from memory and shadow-scores candidates.
+
+    Versions are resolved through model_versions.json: a version with an
+    'artifact' entry is loaded from data/<artifact>, and the current version
+    falls back to MLBeam_model.pkl. Versions listed under 'shadow_versions'
+    are scored on a background thread against a sampled fraction of live
+    requests to the current version, and the differences are appended to
+    shadow_scores.jsonl. At most MAX_PENDING_SHADOW scorings are queued; any
+    more are dropped rather than allowed to pile up.
+
+    The Next.js API starts a fresh predict.py per request, so there each
+    request loads its models from disk and the in-memory cache only pays off
+    in long-lived callers such as replay_traffic.py. The shadow sample rate
+    keeps candidate loads off most requests in that mode.
+    """
+
+    def __init__(self, versions_file=DEFAULT_VERSIONS_FILE, shadow_scores_path=SHADOW_SCORES_PATH,
+                 shadow_sample_rate=None):
+        self.versions_file = versions_file
+        self.shadow_scores_path = shadow_scores_path
+        if shadow_sample_rate is None:
+            try:
+                shadow_sample_rate = float(os.environ.get('BEAM_SHADOW_SAMPLE_RATE', DEFAULT_SHADOW_SAMPLE_RATE))
+            except ValueError:
+                shadow_sample_rate = DEFAULT_SHADOW_SAMPLE_RATE
+        self.shadow_sample_rate = shadow_sample_rate
+        self.engines = {}
+        self.lock = threading.Lock()
+        # Worker threads are only started once the first shadow job is submitted
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.shadow_slots = threading.BoundedSemaphore(MAX_PENDING_SHADOW)
+        self.pending = set()
+        self.registry_mtime = None
+        self.generation = None
+        self.registry = {'current_version': None, 'versions': {}}
+        self.refresh()
+
+    def refresh(self):
+        """Reload the registry and drop loaded models when the version pointer file changes"""
+        try:
+            mtime = os.path.getmtime(self.versions_file)
+        except OSError:
+            mtime = None
+        if mtime == self.registry_mtime and self.generation == _cache_generation:
+            return
+        with self.lock:
+            self.registry = self.load_registry()
+            self.engines = {}
+            self.registry_mtime = mtime
+            self.generation = _cache_generation
+
+    def load_registry(self):
+        """Read the versions tracking file"""
+        if not os.path.exists(self.versions_file):
+            return {'current_version': None, 'versions': {}}
+        with open(self.versions_file, 'r') as f:
+            return json.load(f)
+
+    @property
+    def current_version(self):
+        return self.registry.get('current_version')
+
+    def artifact_path(self, version):
+        """Path of the stored artifact for a version, or None if it cannot be served"""
+        info = self.registry['versions'].get(version)
+        if info and info.get('artifact'):
+            return os.path.join(DATA_DIR, info['artifact'])
+        if version == self.current_version:
+            return DEFAULT_MODEL_PATH
+        return None
+
+    def get_engine(self, version=None):
+        """Return (version, engine), loading the version's artifact on first use"""
+        version = version or self.current_version
+        with self.lock:
+            engine = self.engines.get(version)
+            if engine is None:
+                model_path = self.artifact_path(version)
+                if model_path is None:
+                    return version, None
+                engine = PredictionEngine(model_path)
+                self.engines[version] = engine
+        return version, engine
+
+    def predict(self, input_data, version=None):
+        """Route a prediction to the requested version, defaulting to the current one"""
+        self.refresh()
+        version, engine = self.get_engine(version)
+        if engine is None:
+            return {
+                'error': f'Model version {version} is not available',
+                'success': False
+            }
+
+        result = engine.predict(input_data)
+        if result.get('success'):
+            result['version'] = version
+            if version == self.current_version:
+                self.shadow_score(input_data, result['shearStrength'])
+        return result
+
+    def shadow_versions(self):
+        return [v for v in self.registry.get('shadow_versions', []) if v != self.current_version]
+
+    def shadow_score(self, input_data, active_prediction):
+        """Queue candidate scoring off the request path for a sampled fraction of requests"""
+        candidates = self.shadow_versions()
+        if not candidates or random.random() >= self.shadow_sample_rate:
+            return
+
+        for candidate in candidates:
+            if not self.shadow_slots.acquire(blocking=False):
+                # Queue is full; skip this sample instead of delaying live traffic
+                return
+            future = self.executor.submit(
+                self.score_candidate, candidate, dict(input_data), active_prediction)
+            with self.lock:
+                self.pending.add(future)
+            future.add_done_callback(self.finish_shadow)
+
+    def finish_shadow(self, future):
+        """Release the queue slot and forget the finished future"""
+        with self.lock:
+            self.pending.discard(future)
+        self.shadow_slots.release()
+
+    def score_candidate(self, candidate, input_data, active_prediction):
+        """Score one input with a candidate and record its difference from the active model"""
+        try:
+            _, engine = self.get_engine(candidate)
+            if engine is None:
+                return
+            result = engine.predict(input_data)
+            if not result.get('success'):
+                return
+            record = {
+                't': round(time.time(), 3),
+                'active': self.current_version,
+                'candidate': candidate,
+                'active_kn': active_prediction,
+                'diff_kn': result['shearStrength'] - active_prediction
+            }
+            with self.lock:
+                with open(self.shadow_scores_path, 'a') as f:
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        except Exception:
+            # Shadow scoring must never affect live traffic
+            pass
+
+    def drain(self):
+        """Wait for queued shadow scoring to finish and stop the workers"""
+        self.executor.shutdown(wait=True)
+
+
+def summarize_prediction_diffs(diffs, baselines):
+    """Aggregate candidate-minus-baseline differences in kN; None when there are none"""
+    if not diffs:
+        return None
+
+    diffs = np.array(diffs, dtype=float)
+    baselines = np.array(baselines, dtype=float)
+    nonzero = baselines != 0
+    rel_diffs = np.abs(diffs[nonzero]) / np.abs(baselines[nonzero])
+    return {
+        'samples': len(diffs),
+        'mean_diff_kn': float(diffs.mean()),
+        'mean_abs_diff_kn': float(np.abs(diffs).mean()),
+        'max_abs_diff_kn': float(np.abs(diffs).max()),
+        'mean_rel_diff': float(rel_diffs.mean()) if rel_diffs.size else 0.0
+    }
+
+
+def summarize_shadow_scores(candidate, active_version=None, shadow_scores_path=SHADOW_SCORES_PATH):
+    """Aggregate recorded shadow differences for a candidate, optionally against one active version"""
+    if not os.path.exists(shadow_scores_path):
+        return None
+
+    diffs = []
+    baselines = []
+    with open(shadow_scores_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record['candidate'] != candidate:
+                continue
+            if active_version and record['active'] != active_version:
+                continue
+            diffs.append(record['diff_kn'])
+            baselines.append(record['active_kn'])
+
+    summary = summarize_prediction_diffs(diffs, baselines)
+    if summary:
+        summary['candidate'] = candidate
+    return summary
+
+
+def capture_input(input_data):
+    """
+    Append a sampled copy of the prediction input to the traffic capture log.
+
+    Capture is off unless BEAM_CAPTURE_SAMPLE_RATE is set to a value in (0, 1].
+    Each line is a compact JSON record: {"t": unix_time, "x": [features...]}
+    with features in FEATURE_NAMES order, so replay_traffic.py can read it back.
+    """
+    try:
+        sample_rate = float(os.environ.get('BEAM_CAPTURE_SAMPLE_RATE', '0'))
+    except ValueError:
+        return
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return
+
+    try:
+        record = {
+            't': round(time.time(), 3),
+            'x': [float(input_data[name]) for name in FEATURE_NAMES]
+        }
+        capture_path = os.environ.get('BEAM_CAPTURE_PATH', DEFAULT_CAPTURE_PATH)
+        with open(capture_path, 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+    except (KeyError, TypeError, ValueError, OSError):
+        # Capture must never break a prediction
+        pass
+
+
+def attach_nearest_beams(result, engine, input_data, k=5):
+    """Add the most similar tested beams to a successful prediction when an index exists"""
+    try:
+        from nearest_beams import index_for_engine, find_nearest_beams
+
+        # Skip missing indexes and stale ones left over from a previous model version
+        index = index_for_engine(engine)
+        if index is None:
+            return
+        result['nearestBeams'] = find_nearest_beams(input_data, k=k, index=index)
+    except Exception:
+        # Neighbour lookup is supplementary and must never fail a prediction
+        pass
+
+
+def predict_beam_strength(input_data, version=None, server=None):
+    """
+    Predict beam shear strength using the trained ML model
+
+    Args:
+        input_data: Dictionary containing beam parameters
+        version: Registered model version to use, defaults to the current one
+        server: ModelServer to route through, a fresh one if not given
+
+    Returns:
+        Dictionary with prediction results
+    """
+    try:
+        capture_input(input_data)
+        server = server or ModelServer()
+        result = server.predict(input_data, version)
+        if result.get('success'):
+            _, engine = server.get_engine(result['version'])
+            attach_nearest_beams(result, engine, input_data)
+        return result
+
     except Exception as e:
         return {
             'error': f'Prediction failed: {str(e)}',
@@ -83,10 +391,15 @@ if __name__ == '__main__':
     try:
         input_json = sys.stdin.read()
         input_data = json.loads(input_json)
-        
-        result = predict_beam_strength(input_data)
-        print(json.dumps(result))
-        
+        version = input_data.pop('version', None)
+
+        server = ModelServer()
+        result = predict_beam_strength(input_data, version, server)
+        print(json.dumps(result), flush=True)
+
+        # Shadow scoring runs after the response has been written
+        server.drain()
+
     except Exception as e:
         error_result = {
             'error': f'Script execution failed: {str(e)}',
@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from predict import FEATURE_NAMES, SCRIPT_DIR, DEFAULT_MODEL_PATH, DEFAULT_CAPTURE_PATH, PredictionEngine, summarize_prediction_diffs
+
+
+class SubprocessEngine:
+    """
+    Sends each request through a fresh predict.py process, as the Next.js API does
+
+    The latency includes interpreter start-up and loading the served artifact,
+    which is where disk and CPU contention from a retrain shows up. The
+    response counts as done once its JSON line is read, as with PythonShell.
+    Shadow scoring and traffic capture are turned off in the child so replayed
+    requests never count toward promotion or feed back into the capture log.
+    """
+
+    def __init__(self, version=None):
+        self.version = version
+
+    def load_model(self):
+        return None
+
+    def predict(self, input_data):
+        payload = dict(input_data)
+        if self.version:
+            payload['version'] = self.version
+
+        env = dict(os.environ, BEAM_SHADOW_SAMPLE_RATE='0', BEAM_CAPTURE_SAMPLE_RATE='0')
+        process = subprocess.Popen([sys.executable, '-u', 'predict.py'], cwd=SCRIPT_DIR, env=env, text=True,
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        process.stdin.write(json.dumps(payload))
+        process.stdin.close()
+        line = process.stdout.readline()
+        threading.Thread(target=process.wait, daemon=True).start()
+
+        try:
+            return json.loads(line)
+        except ValueError:
+            return {'success': False, 'error': 'No output from predict.py'}
+
+
+def load_captured_traffic(capture_path, limit=None):
+    """Read inputs recorded by predict.capture_input"""
+    inputs = []
+    with open(capture_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            inputs.append(dict(zip(FEATURE_NAMES, record['x'])))
+            if limit and len(inputs) >= limit:
+                break
+    return inputs
+
+
+def generate_synthetic_traffic(model_data, count, seed=43):
+    """Draw inputs around the training distribution stored in the model artifact"""
+    rng = np.random.default_rng(seed)
+    mu = np.asarray(model_data['mu'], dtype=float)
+    sigma = np.asarray(model_data['sigma'], dtype=float)
+
+    samples = rng.normal(mu, sigma, size=(count, len(FEATURE_NAMES)))
+    samples = np.clip(samples, 1e-6, None)
+
+    inputs = []
+    for row in samples:
+        input_data = dict(zip(FEATURE_NAMES, row.tolist()))
+        # Keep the derived shear span ratio consistent with a and d
+        input_data['abyd'] = input_data['a_mm'] / input_data['d_mm']
+        inputs.append(input_data)
+    return inputs
+
+
+def run_load(engine, inputs, concurrency=1, rate=None):
+    """
+    Drive the engine with the given inputs and collect per-request latencies.
+
+    With a rate (requests/second) requests are issued on a fixed schedule and
+    latency is measured from the scheduled start, so queueing delay is counted.
+    Without a rate each worker sends its next request as soon as the last one returns.
+    """
+    engine.load_model()
+
+    latencies = [None] * len(inputs)
+    finished_at = [None] * len(inputs)
+    predictions = [None] * len(inputs)
+    errors = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def send(index):
+        scheduled = start + index / rate if rate else time.perf_counter()
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        result = engine.predict(inputs[index])
+        finished_at[index] = time.perf_counter()
+        latencies[index] = finished_at[index] - scheduled
+        if result.get('success'):
+            predictions[index] = result['shearStrength']
+        else:
+            with lock:
+                errors.append(result.get('error'))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(len(inputs))))
+
+    elapsed = time.perf_counter() - start
+    return latencies, predictions, errors, elapsed, finished_at
+
+
+def summarize_latencies(latencies, elapsed):
+    """Throughput and latency percentiles in milliseconds"""
+    latencies_ms = np.array(latencies, dtype=float) * 1000.0
+    return {
+        'requests': len(latencies),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p90_ms': float(np.percentile(latencies_ms, 90)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'max_ms': float(latencies_ms.max())
+    }
+
+
+def run_load_during_retrain(engine, inputs, concurrency=1, rate=None,
+                            retrain_command=None, retrain_repeats=3):
+    """
+    Measure serving latency on its own, then again while a retrain runs beside it
+
+    The retrain defaults to a throwaway benchmark fit under the training
+    resource policy, so the live model is not replaced. Only requests that
+    finished while the retrain process was still running count toward the
+    concurrent figures.
+    """
+    retrain_command = retrain_command or [sys.executable, 'training_policy.py', '--benchmark-fit',
+                                          str(retrain_repeats)]
+
+    latencies, _, _, elapsed, _ = run_load(engine, inputs, concurrency, rate)
+    baseline = summarize_latencies(latencies, elapsed)
+
+    process = subprocess.Popen(retrain_command, cwd=SCRIPT_DIR,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    retrain_start = time.perf_counter()
+    ended = {}
+
+    def watch():
+        process.wait()
+        ended['at'] = time.perf_counter()
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+
+    latencies, _, _, elapsed, finished_at = run_load(engine, inputs, concurrency, rate)
+    watcher.join()
+    retrain_end = ended['at']
+
+    during = [lat for lat, done in zip(latencies, finished_at) if done <= retrain_end]
+    return {
+        'baseline': baseline,
+        'during_retrain': summarize_latencies(during, min(elapsed, retrain_end - retrain_start)) if during else None,
+        'retrain_seconds': retrain_end - retrain_start,
+        'retrain_exit_code': process.returncode
+    }
+
+
+def compare_predictions(inputs, baseline_predictions, candidate_engine):
+    """Score the same inputs with a second artifact and summarize the differences"""
+    diffs = []
+    baselines = []
+    for input_data, baseline in zip(inputs, baseline_predictions):
+        if baseline is None:
+            continue
+        result = candidate_engine.predict(input_data)
+        if not result.get('success'):
+            continue
+        diffs.append(result['shearStrength'] - baseline)
+        baselines.append(baseline)
+
+    return summarize_prediction_diffs(diffs, baselines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded or synthetic traffic against the prediction engine')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Model artifact to load test')
+    parser.add_argument('--compare', help='Second model artifact to diff outputs against, e.g. ../data/model_versions/<version>.pkl')
+    parser.add_argument('--capture', default=None, help=f'Traffic capture log to replay (default {DEFAULT_CAPTURE_PATH} if present)')
+    parser.add_argument('--synthetic', type=int, default=0, help='Generate this many synthetic requests instead of replaying a capture')
+    parser.add_argument('--limit', type=int, default=None, help='Replay at most this many captured requests')
+    parser.add_argument('--concurrency', type=int, default=1, help='Number of concurrent workers')
+    parser.add_argument('--rate', type=float, default=None, help='Target request rate per second (default: as fast as possible)')
+    parser.add_argument('--during-retrain', action='store_true',
+                        help='Also measure latency while a benchmark retrain runs under the training policy')
+    parser.add_argument('--retrain-repeats', type=int, default=3,
+                        help='Forests fitted by the benchmark retrain; raise it to cover a longer load')
+    parser.add_argument('--subprocess', action='store_true',
+                        help='Send each request through a fresh predict.py as the API does; serves the current registered version')
+    parser.add_argument('--version', default=None, help='Registered version to request in --subprocess mode')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    args = parser.parse_args()
+
+    engine = PredictionEngine(args.model)
+    if not os.path.exists(args.model):
+        print(f"❌ Model file not found: {args.model}")
+        return False
+
+    capture_path = args.capture or DEFAULT_CAPTURE_PATH
+    if args.synthetic:
+        inputs = generate_synthetic_traffic(engine.load_model(), args.synthetic)
+        source = f"synthetic ({args.synthetic} requests)"
+    elif os.path.exists(capture_path):
+        inputs = load_captured_traffic(capture_path, args.limit)
+        source = capture_path
+    else:
+        print(f"❌ No traffic capture at {capture_path}; use --synthetic N")
+        return False
+
+    if not inputs:
+        print("❌ No requests to replay")
+        return False
+
+    # --model still supplies the synthetic input distribution in subprocess mode
+    serving_engine = SubprocessEngine(args.version) if args.subprocess else engine
+
+    if args.during_retrain:
+        report = run_load_during_retrain(serving_engine, inputs, args.concurrency, args.rate,
+                                         retrain_repeats=args.retrain_repeats)
+        if args.json:
+            print(json.dumps(report, indent=2))
+            return True
+
+        print(f"📊 Serving latency around a concurrent retrain ({len(inputs)} requests per run)")
+        print(f"   Retrain took {report['retrain_seconds']:.2f}s (exit code {report['retrain_exit_code']})")
+        for label, key in (('Idle', 'baseline'), ('During retrain', 'during_retrain')):
+            latency = report[key]
+            if latency is None:
+                print(f"   {label}: retrain finished before any request completed")
+                continue
+            print(f"   {label}: {latency['throughput_rps']:.1f} req/s, p50 {latency['p50_ms']:.2f} ms, "
+                  f"p99 {latency['p99_ms']:.2f} ms over {latency['requests']} requests")
+        return True
+
+    latencies, predictions, errors, elapsed, _ = run_load(serving_engine, inputs, args.concurrency, args.rate)
+    report = {
+        'model': args.model,
+        'source': source,
+        'concurrency': args.concurrency,
+        'rate': args.rate,
+        'errors': len(errors),
+        'latency': summarize_latencies(latencies, elapsed)
+    }
+
+    if args.compare:
+        report['comparison'] = compare_predictions(inputs, predictions, PredictionEngine(args.compare))
+        report['compare_model'] = args.compare
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return True
+
+    latency = report['latency']
+    print(f"📊 Replayed {latency['requests']} requests from {source}")
+    print(f"   Concurrency: {args.concurrency}, Target rate: {args.rate or 'unbounded'}")
+    print(f"   Throughput: {latency['throughput_rps']:.1f} req/s")
+    print(f"   Latency p50: {latency['p50_ms']:.2f} ms, p90: {latency['p90_ms']:.2f} ms, "
+          f"p99: {latency['p99_ms']:.2f} ms, max: {latency['max_ms']:.2f} ms")
+    print(f"   Errors: {len(errors)}")
+
+    comparison = report.get('comparison')
+    if comparison:
+        print(f"📈 Output differences vs {args.compare}:")
+        print(f"   Mean diff: {comparison['mean_diff_kn']:+.3f} kN")
+        print(f"   Mean |diff|: {comparison['mean_abs_diff_kn']:.3f} kN")
+        print(f"   Max |diff|: {comparison['max_abs_diff_kn']:.3f} kN")
+        print(f"   Mean relative diff: {comparison['mean_rel_diff']:.2%}")
+    return True
+
+
+if __name__ == '__main__':
+    main()
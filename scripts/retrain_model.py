@@ -2,13 +2,20 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
+from datetime import datetime
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
+from nearest_beams import flag_near_duplicates
+from training_policy import apply_training_policy, training_n_jobs
+from model_registry import initialize_versions, current_artifact_path, unique_version_name, update_versions
 
-def retrain_model():
+def retrain_model(n_jobs=None):
     print("Retraining model with new data...")
     
+    # Keep training off the cores reserved for prediction serving
+    n_jobs = n_jobs or training_n_jobs()
+    
     # Load original training data
     original_data = pd.read_excel('../../Inputs.xlsx')
     print(f"📊 Original training data: {len(original_data)} samples")
@@ -27,6 +34,9 @@ def retrain_model():
         print("❌ No additional data to retrain with")
         return False
     
+    # Flag submissions that repeat an already tested beam
+    flag_near_duplicates(additional_data, current_artifact_path('../data/model_versions.json', 'MLBeam_model.pkl'))
+    
     # Convert additional data to DataFrame
     additional_df = pd.DataFrame(additional_data)
     
@@ -58,7 +68,7 @@ def retrain_model():
         min_samples_leaf=1,
         random_state=43,
         oob_score=True,
-        n_jobs=-1
+        n_jobs=n_jobs
     )
     model.fit(X_train, y_train)
     
@@ -75,6 +85,12 @@ def retrain_model():
     print(f"   Out-of-bag Score: {model.oob_score_:.4f}")
     
     # Save new model
+    versions_file = '../data/model_versions.json'
+    versions_dir = '../data/model_versions'
+    os.makedirs(versions_dir, exist_ok=True)
+    if not os.path.exists(versions_file):
+        initialize_versions(versions_file)
+    version = unique_version_name(versions_file, versions_dir, f"v1.1.{len(additional_data)}")
     model_data = {
         'model': model,
         'mu': mu,
@@ -82,17 +98,22 @@ def retrain_model():
         'training_samples': len(combined_data),
         'additional_samples': len(additional_data),
         'r2_score': r2_test,
-        'oob_score': model.oob_score_
+        'oob_score': model.oob_score_,
+        'version': version,
+        'created_at': datetime.now().isoformat()
     }
     
-    model_path = 'MLBeam_model.pkl'
-    joblib.dump(model_data, model_path)
-    print(f"✅ New model saved to {model_path}")
+    # Register the model so serving switches to it through the version pointer; the
+    # stored artifact is what gets served, so MLBeam_model.pkl is not rewritten
+    update_versions(versions_file, version, model_data, additional_data, versions_dir,
+                    original_data=original_data)
+    print(f"✅ Registered as {version}")
     
     return True
 
 if __name__ == '__main__':
-    success = retrain_model()
+    # Lower this process's priority and pin it before training
+    success = retrain_model(n_jobs=apply_training_policy())
     if success:
         print("🎉 Model retraining completed successfully!")
     else:
@@ -2,16 +2,26 @@ import pandas as pd
 import numpy as np
 import joblib
 import os
-import shutil
 from datetime import datetime
 import json
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score
+from training_policy import apply_training_policy, training_n_jobs
+from nearest_beams import flag_near_duplicates
+from model_registry import (initialize_versions, create_backup, current_artifact_path,
+                            unique_version_name, update_versions)
 
-def retrain_with_validation():
+def retrain_with_validation(shadow=False, n_jobs=None):
+    """
+    Retrain with validation; with shadow=True a passing model is registered
+    as a shadow candidate instead of replacing the current model
+    """
     print("Starting model retraining with validation...")
     
+    # Keep training off the cores reserved for prediction serving
+    n_jobs = n_jobs or training_n_jobs()
+    
     # Paths
     versions_dir = '../data/model_versions'
     current_model_path = 'MLBeam_model.pkl'
@@ -27,7 +37,7 @@ def retrain_with_validation():
         initialize_versions(versions_file)
     
     # Create backup before retraining
-    backup_version = create_backup(current_model_path, versions_dir)
+    create_backup(current_artifact_path(versions_file, current_model_path), versions_dir)
     
     try:
         # Load original data
@@ -45,6 +55,9 @@ def retrain_with_validation():
             print("❌ No additional data to retrain with")
             return False
         
+        # Flag submissions that repeat an already tested beam
+        flag_near_duplicates(additional_data, current_artifact_path(versions_file, current_model_path))
+        
         # Convert additional data to DataFrame
         additional_df = pd.DataFrame(additional_data)
         
@@ -75,7 +88,7 @@ def retrain_with_validation():
             min_samples_leaf=1,
             random_state=43,
             oob_score=True,
-            n_jobs=-1
+            n_jobs=n_jobs
         )
         model.fit(X_train, y_train)
         
@@ -92,7 +105,7 @@ def retrain_with_validation():
         print(f"   Out-of-bag Score: {model.oob_score_:.4f}")
         
         # Load current model for comparison
-        current_model_data = joblib.load(current_model_path)
+        current_model_data = joblib.load(current_artifact_path(versions_file, current_model_path))
         current_r2 = current_model_data.get('r2_score', 0.794)
         current_oob = current_model_data.get('oob_score', 0.794)
         
@@ -112,7 +125,7 @@ def retrain_with_validation():
         
         if r2_improvement >= improvement_threshold or oob_improvement >= improvement_threshold:
             # New model is better, save it
-            new_version = f"v1.1.{len(additional_data)}"
+            new_version = unique_version_name(versions_file, versions_dir, f"v1.1.{len(additional_data)}")
             
             model_data = {
                 'model': model,
@@ -126,10 +139,17 @@ def retrain_with_validation():
                 'created_at': datetime.now().isoformat()
             }
             
-            joblib.dump(model_data, current_model_path)
+            if shadow:
+                # Serve alongside the current model until shadow scores justify promotion
+                update_versions(versions_file, new_version, model_data, additional_data, versions_dir, shadow=True,
+                                original_data=original_data)
+                print(f"New model registered as shadow candidate {new_version}")
+                return True
             
-            # Update versions tracking
-            update_versions(versions_file, new_version, model_data, additional_data)
+            # Serving reads the stored artifact through the version pointer, so
+            # MLBeam_model.pkl stays the bootstrap model and is not rewritten
+            update_versions(versions_file, new_version, model_data, additional_data, versions_dir,
+                            original_data=original_data)
             
             print(f"New model saved as {new_version}")
             print(f"Model retraining successful with improved performance!")
@@ -140,89 +160,16 @@ def retrain_with_validation():
             return False
             
     except Exception as e:
+        # The version pointer only moves in update_versions, so there is nothing to undo
         print(f"Error during retraining: {e}")
-        print(f"Rolling back to previous version...")
-        rollback_to_version(current_model_path, versions_dir, backup_version)
-        return False
-
-def initialize_versions(versions_file):
-    """Initialize the versions tracking file"""
-    versions = {
-        "current_version": "v1.0.0",
-        "versions": {
-            "v1.0.0": {
-                "version": "v1.0.0",
-                "created_at": datetime.now().isoformat(),
-                "training_samples": 978,
-                "additional_samples": 0,
-                "r2_score": 0.794,
-                "oob_score": 0.794,
-                "description": "Original model trained on 978 samples",
-                "status": "active"
-            }
-        }
-    }
-    
-    with open(versions_file, 'w') as f:
-        json.dump(versions, f, indent=2)
-
-def create_backup(current_model_path, versions_dir):
-    """Create a backup of the current model"""
-    if not os.path.exists(current_model_path):
-        print("No current model to backup")
-        return None
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_version = f"v1.0.{timestamp}"
-    backup_path = os.path.join(versions_dir, f"{backup_version}.pkl")
-    shutil.copy2(current_model_path, backup_path)
-    
-    print(f"Model backed up as {backup_version}")
-    return backup_version
-
-def rollback_to_version(current_model_path, versions_dir, version_name):
-    """Rollback to a previous model version"""
-    if not version_name:
+        print(f"Keeping current model")
         return False
-        
-    backup_path = os.path.join(versions_dir, f"{version_name}.pkl")
-    
-    if os.path.exists(backup_path):
-        shutil.copy2(backup_path, current_model_path)
-        print(f"Rolled back to {version_name}")
-        return True
-    else:
-        print(f"Version {version_name} not found")
-        return False
-
-def update_versions(versions_file, new_version, model_data, additional_data):
-    """Update the versions tracking file"""
-    with open(versions_file, 'r') as f:
-        versions = json.load(f)
-    
-    # Mark current version as inactive
-    if versions["current_version"] in versions["versions"]:
-        versions["versions"][versions["current_version"]]["status"] = "inactive"
-    
-    # Add new version
-    versions["versions"][new_version] = {
-        "version": new_version,
-        "created_at": model_data["created_at"],
-        "training_samples": model_data["training_samples"],
-        "additional_samples": model_data["additional_samples"],
-        "r2_score": model_data["r2_score"],
-        "oob_score": model_data["oob_score"],
-        "description": f"Retrained with {len(additional_data)} additional samples",
-        "status": "active"
-    }
-    
-    versions["current_version"] = new_version
-    
-    with open(versions_file, 'w') as f:
-        json.dump(versions, f, indent=2)
 
 if __name__ == '__main__':
-    success = retrain_with_validation()
+    import sys
+    
+    # Lower this process's priority and pin it before training
+    success = retrain_with_validation(shadow='--shadow' in sys.argv, n_jobs=apply_training_policy())
     if success:
         print("Model retraining completed successfully!")
     else:
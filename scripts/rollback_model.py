@@ -1,105 +1,128 @@
+import sys
 import pandas as pd
 import numpy as np
 import joblib
 import os
-import json
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import r2_score
+from nearest_beams import refresh_neighbor_index
+from model_version_manager import ModelVersionManager
+from training_policy import apply_training_policy, training_n_jobs
+
+ORIGINAL_VERSION = 'v1.0.0'
+
+def rollback_model(version_name=ORIGINAL_VERSION, n_jobs=None):
+    """
+    Roll back to a registered model version.
+
+    Registered versions are restored by switching the current_version pointer
+    to their stored artifact. Additional training data and the other
+    registered versions are left untouched.
+    """
+    print(f"Rolling back to model {version_name}...")
 
-def rollback_to_original():
-    print("Rolling back to original model v1.0.0...")
-    
     try:
-        # Load original data
-        data = pd.read_excel('../../Inputs.xlsx')
-        print(f"Loaded original data: {len(data)} samples")
-        
-        # Prepare features and target
-        feature_cols = ['h_mm', 'd_mm', 'b_mm', 'a_mm', 'abyd', 'fck_Mpa',
-                       'rho', 'fyk_Mpa', 'da_mm', 'Plate_Top_mm', 'Plate_Bottom_mm']
-        target_col = 'V_Kn'
-        
-        X = data[feature_cols].values
-        y = data[target_col].values
-        
-        # Standardize
-        mu = X.mean(axis=0)
-        sigma = X.std(axis=0)
-        X_standardized = (X - mu) / sigma
-        
-        # Split data
-        X_train, X_test, y_train, y_test = train_test_split(X_standardized, y, test_size=0.2, random_state=43)
-        
-        # Train original model
-        model = RandomForestRegressor(
-            n_estimators=100,
-            max_features='sqrt',
-            min_samples_leaf=1,
-            random_state=43,
-            oob_score=True,
-            n_jobs=-1
-        )
-        model.fit(X_train, y_train)
-        
-        # Test performance
-        y_test_pred = model.predict(X_test)
-        r2_test = r2_score(y_test, y_test_pred)
-        
-        print(f"Original model R²: {r2_test:.4f}")
-        print(f"Original model OOB: {model.oob_score_:.4f}")
-        
-        # Save original model
-        original_model_data = {
-            'model': model,
-            'mu': mu,
-            'sigma': sigma,
-            'training_samples': len(data),
-            'additional_samples': 0,
-            'r2_score': r2_test,
-            'oob_score': model.oob_score_,
-            'version': 'v1.0.0',
-            'created_at': '2025-09-12T19:47:22.821685'
-        }
-        
-        joblib.dump(original_model_data, 'MLBeam_model.pkl')
-        
-        # Reset model versions
-        versions = {
-            "current_version": "v1.0.0",
-            "versions": {
-                "v1.0.0": {
-                    "version": "v1.0.0",
-                    "created_at": "2025-09-12T19:47:22.821685",
-                    "training_samples": len(data),
-                    "additional_samples": 0,
-                    "r2_score": r2_test,
-                    "oob_score": model.oob_score_,
-                    "description": "Original model trained on 978 samples",
-                    "status": "active"
-                }
-            }
-        }
-        
-        with open('../data/model_versions.json', 'w') as f:
-            json.dump(versions, f, indent=2)
-        
-        # Clear additional training data
-        with open('../data/additional_training_data.json', 'w') as f:
-            json.dump([], f)
-        
-        print("Model rolled back to original v1.0.0 successfully!")
-        print("All additional training data cleared!")
-        print("Model versions reset!")
-        return True
-        
+        manager = ModelVersionManager()
+        if manager.rollback_to_version(version_name):
+            return True
+
+        if version_name != ORIGINAL_VERSION:
+            return False
+
+        # The original model has no stored artifact yet; rebuild and register it once
+        print("No stored artifact for the original model, rebuilding it from Inputs.xlsx")
+        return rebuild_original_model(manager, n_jobs)
+
     except Exception as e:
         print(f"Error during rollback: {e}")
         return False
 
+def rebuild_original_model(manager, n_jobs=None):
+    """Retrain v1.0.0 from Inputs.xlsx, store it as an artifact and point current_version at it"""
+    # Keep training off the cores reserved for prediction serving
+    n_jobs = n_jobs or training_n_jobs()
+
+    # Load original data
+    data = pd.read_excel('../../Inputs.xlsx')
+    print(f"Loaded original data: {len(data)} samples")
+
+    # Prepare features and target
+    feature_cols = ['h_mm', 'd_mm', 'b_mm', 'a_mm', 'abyd', 'fck_Mpa',
+                   'rho', 'fyk_Mpa', 'da_mm', 'Plate_Top_mm', 'Plate_Bottom_mm']
+    target_col = 'V_Kn'
+
+    X = data[feature_cols].values
+    y = data[target_col].values
+
+    # Standardize
+    mu = X.mean(axis=0)
+    sigma = X.std(axis=0)
+    X_standardized = (X - mu) / sigma
+
+    # Split data
+    X_train, X_test, y_train, y_test = train_test_split(X_standardized, y, test_size=0.2, random_state=43)
+
+    # Train original model
+    model = RandomForestRegressor(
+        n_estimators=100,
+        max_features='sqrt',
+        min_samples_leaf=1,
+        random_state=43,
+        oob_score=True,
+        n_jobs=n_jobs
+    )
+    model.fit(X_train, y_train)
+
+    # Test performance
+    y_test_pred = model.predict(X_test)
+    r2_test = r2_score(y_test, y_test_pred)
+
+    print(f"Original model R²: {r2_test:.4f}")
+    print(f"Original model OOB: {model.oob_score_:.4f}")
+
+    original_model_data = {
+        'model': model,
+        'mu': mu,
+        'sigma': sigma,
+        'training_samples': len(data),
+        'additional_samples': 0,
+        'r2_score': r2_test,
+        'oob_score': model.oob_score_,
+        'version': ORIGINAL_VERSION,
+        'created_at': '2025-09-12T19:47:22.821685'
+    }
+
+    # Store the artifact so later rollbacks are a pointer switch
+    artifact_path = os.path.join(manager.versions_dir, f"{ORIGINAL_VERSION}.pkl")
+    joblib.dump(original_model_data, artifact_path)
+    # v1.0.0 was trained on Inputs.xlsx alone
+    refresh_neighbor_index(artifact_path, data, [])
+
+    versions = manager.load_versions()
+    versions["versions"][ORIGINAL_VERSION] = {
+        "version": ORIGINAL_VERSION,
+        "created_at": original_model_data["created_at"],
+        "training_samples": len(data),
+        "additional_samples": 0,
+        "r2_score": r2_test,
+        "oob_score": model.oob_score_,
+        "description": "Original model trained on 978 samples",
+        "artifact": f"model_versions/{ORIGINAL_VERSION}.pkl",
+        "status": "inactive"
+    }
+    manager.switch_current_version(versions, ORIGINAL_VERSION)
+
+    print(f"Model rolled back to original {ORIGINAL_VERSION} successfully!")
+    return True
+
 if __name__ == '__main__':
-    success = rollback_to_original()
+    # python rollback_model.py [version]   defaults to the original v1.0.0
+    target_version = sys.argv[1] if len(sys.argv) > 1 else ORIGINAL_VERSION
+    # Lower this process's priority and pin it in case the original model must be refit
+    success = rollback_model(target_version, n_jobs=apply_training_policy())
     if success:
         print("Rollback completed successfully!")
     else:
         print("Rollback failed!")
+        sys.exit(1)
@@ -0,0 +1,162 @@
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+POLICY_PATH = os.path.join(SCRIPT_DIR, '..', 'data', 'training_policy.json')
+
+DEFAULT_POLICY = {
+    # Upper bound on RandomForestRegressor n_jobs; None means one per training core
+    'max_workers': None,
+    # Cores kept free for prediction serving when cpu_affinity is not given
+    'reserved_cores': 1,
+    # Explicit list of cores training may run on; overrides reserved_cores
+    'cpu_affinity': None,
+    # Added to the training process's niceness so serving wins CPU contention
+    'niceness': 10,
+    # Address-space ceiling for the training process; None leaves it unlimited
+    'memory_limit_mb': None
+}
+
+ENV_OVERRIDES = {
+    'BEAM_TRAIN_MAX_WORKERS': ('max_workers', int),
+    'BEAM_TRAIN_RESERVED_CORES': ('reserved_cores', int),
+    'BEAM_TRAIN_CPU_AFFINITY': ('cpu_affinity', lambda v: [int(c) for c in v.split(',') if c.strip()]),
+    'BEAM_TRAIN_NICENESS': ('niceness', int),
+    'BEAM_TRAIN_MEMORY_LIMIT_MB': ('memory_limit_mb', int)
+}
+
+
+def load_training_policy(policy_path=POLICY_PATH):
+    """Defaults, overridden by data/training_policy.json, overridden by BEAM_TRAIN_* variables"""
+    policy = dict(DEFAULT_POLICY)
+
+    if os.path.exists(policy_path):
+        with open(policy_path, 'r') as f:
+            policy.update(json.load(f))
+
+    for env_name, (key, parse) in ENV_OVERRIDES.items():
+        value = os.environ.get(env_name)
+        if value:
+            policy[key] = parse(value)
+
+    return policy
+
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def training_cores(policy):
+    """Cores training may use: the explicit affinity, or all but the reserved ones"""
+    cores = available_cores()
+    if policy.get('cpu_affinity'):
+        allowed = [c for c in policy['cpu_affinity'] if c in cores]
+        if allowed:
+            return allowed
+        print(f"⚠️  None of the configured training cores {policy['cpu_affinity']} are available; "
+              f"reserving cores for serving instead")
+
+    reserved = max(0, policy.get('reserved_cores') or 0)
+    # Always leave training at least one core
+    return cores[:max(1, len(cores) - reserved)]
+
+
+def training_n_jobs(policy=None):
+    """Worker count for a fit under the policy, without touching the calling process"""
+    policy = policy or load_training_policy()
+    n_jobs = len(training_cores(policy))
+    if policy.get('max_workers'):
+        n_jobs = max(1, min(n_jobs, policy['max_workers']))
+    return n_jobs
+
+
+def apply_training_policy(policy=None):
+    """
+    Restrict the current process for training and return the n_jobs to train with
+
+    Only call this from a training script's __main__: lowered priority cannot
+    be raised again by an unprivileged process, so library code should use
+    training_n_jobs() and leave the process alone. Platforms without a given
+    control simply skip it.
+    """
+    policy = policy or load_training_policy()
+    cores = training_cores(policy)
+
+    if hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError as e:
+            print(f"⚠️  Could not set training CPU affinity: {e}")
+
+    if policy.get('niceness') and hasattr(os, 'nice'):
+        try:
+            os.nice(policy['niceness'])
+        except OSError as e:
+            print(f"⚠️  Could not lower training priority: {e}")
+
+    if policy.get('memory_limit_mb') and resource is not None:
+        limit = policy['memory_limit_mb'] * 1024 * 1024
+        try:
+            # Only the soft limit, so the hard limit stays where it was
+            _, hard = resource.getrlimit(resource.RLIMIT_AS)
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+        except (ValueError, OSError) as e:
+            print(f"⚠️  Could not set training memory limit: {e}")
+
+    n_jobs = training_n_jobs(policy)
+    memory = f"{policy['memory_limit_mb']} MB" if policy.get('memory_limit_mb') else 'unlimited'
+    print(f"⚙️  Training policy: {n_jobs} workers on cores {cores}, "
+          f"nice +{policy.get('niceness') or 0}, memory {memory}")
+    return n_jobs
+
+
+def benchmark_fit(samples=978, repeats=3, n_jobs=None):
+    """
+    Fit forests shaped like the production model under the policy without saving anything
+
+    replay_traffic.py --during-retrain runs this to measure serving latency
+    during a retrain without replacing the live model.
+    """
+    import numpy as np
+    from sklearn.ensemble import RandomForestRegressor
+
+    n_jobs = n_jobs or training_n_jobs()
+    rng = np.random.default_rng(43)
+    X = rng.normal(size=(samples, 11))
+    y = X @ rng.normal(size=11) + rng.normal(scale=0.1, size=samples)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model = RandomForestRegressor(
+            n_estimators=100,
+            max_features='sqrt',
+            min_samples_leaf=1,
+            random_state=43,
+            oob_score=True,
+            n_jobs=n_jobs
+        )
+        model.fit(X, y)
+    print(f"✅ Benchmark fit finished in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    # python training_policy.py                            show the effective policy
+    # python training_policy.py --benchmark-fit [repeats]  run a throwaway fit under the policy
+    if len(sys.argv) > 1 and sys.argv[1] == '--benchmark-fit':
+        repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+        benchmark_fit(repeats=repeats, n_jobs=apply_training_policy())
+    else:
+        policy = load_training_policy()
+        print(json.dumps(policy, indent=2))
+        print(f"Training cores: {training_cores(policy)}")
@@ -2,7 +2,8 @@
 
 import React, { useState, useEffect } from 'react';
 import { motion } from 'framer-motion';
-import { CheckCircle, XCircle, Clock, Database, Brain, FileText, Settings, RotateCcw } from 'lucide-react';
+import { CheckCircle, XCircle, Clock, Database, Brain, FileText, Settings, RotateCcw, AlertTriangle } from 'lucide-react';
+import { NearestBeam } from '@/lib/types';
 import toast, { Toaster } from 'react-hot-toast';
 
 interface ResearchSubmission {
@@ -28,6 +29,8 @@ interface ResearchSubmission {
     V_Kn: number;
   };
   reviewedAt?: string;
+  nearestBeams?: NearestBeam[];
+  isNearDuplicate?: boolean;
 }
 
 interface ModelVersion {
@@ -422,6 +425,53 @@ export default function AdminDashboard() {
                     </div>
                   </div>
 
+                  {/* Nearest Tested Beams */}
+                  {submission.nearestBeams && submission.nearestBeams.length > 0 && (
+                    <div className="mt-6">
+                      <h3 className="text-lg font-semibold text-gray-900 dark:text-white mb-3">
+                        Most Similar Tested Beams
+                      </h3>
+                      <div className="overflow-x-auto">
+                        <table className="w-full text-sm">
+                          <thead>
+                            <tr className="text-left text-gray-600 dark:text-gray-400 border-b border-gray-200 dark:border-gray-700">
+                              <th className="py-2 pr-4">Beam</th>
+                              <th className="py-2 pr-4">h (mm)</th>
+                              <th className="py-2 pr-4">b (mm)</th>
+                              <th className="py-2 pr-4">a/d</th>
+                              <th className="py-2 pr-4">fck (MPa)</th>
+                              <th className="py-2 pr-4">Tested V (kN)</th>
+                              <th className="py-2">Distance</th>
+                            </tr>
+                          </thead>
+                          <tbody>
+                            {submission.nearestBeams.map((beam, index) => (
+                              <tr key={`${submission.id}-nearest-${index}`} className="border-b border-gray-100 dark:border-gray-700 text-gray-900 dark:text-white">
+                                <td className="py-2 pr-4">{beam.Beam_Number ?? '-'}</td>
+                                <td className="py-2 pr-4">{beam.h_mm}</td>
+                                <td className="py-2 pr-4">{beam.b_mm}</td>
+                                <td className="py-2 pr-4">{beam.abyd.toFixed(2)}</td>
+                                <td className="py-2 pr-4">{beam.fck_Mpa}</td>
+                                <td className="py-2 pr-4 font-medium">{beam.V_Kn.toFixed(1)}</td>
+                                <td className="py-2">{beam.distance.toFixed(3)}</td>
+                              </tr>
+                            ))}
+                          </tbody>
+                        </table>
+                      </div>
+                    </div>
+                  )}
+
+                  {/* Near-duplicate Warning */}
+                  {submission.isNearDuplicate && (
+                    <div className="mt-6 flex items-start gap-3 bg-yellow-50 dark:bg-yellow-900/20 border border-yellow-200 dark:border-yellow-800 rounded-lg p-4 text-sm text-yellow-800 dark:text-yellow-300">
+                      <AlertTriangle className="h-5 w-5 flex-shrink-0" />
+                      <p>
+                        This submission is a near-duplicate of an already tested beam. Approving it will retrain the model without adding new information.
+                      </p>
+                    </div>
+                  )}
+
                   {/* Action Buttons */}
                   <div className="flex gap-4 mt-6">
                     <button
@@ -1,17 +1,28 @@
-import { NextResponse } from 'next/server';
+import { NextRequest, NextResponse } from 'next/server';
 import { spawn } from 'child_process';
 import path from 'path';
 
-export async function POST(): Promise<NextResponse> {
+export async function POST(request: NextRequest): Promise<NextResponse> {
   try {
-    console.log('🔄 Starting model rollback to original version...');
+    // Optional registered version to restore; defaults to the original v1.0.0
+    const body = await request.json().catch(() => ({}));
+    const version = typeof body.version === 'string' ? body.version : 'v1.0.0';
+    
+    if (!/^v[\w.]+$/.test(version)) {
+      return NextResponse.json(
+        { success: false, message: `Invalid model version: ${version}` },
+        { status: 400 }
+      );
+    }
+    
+    console.log(`🔄 Starting model rollback to ${version}...`);
     
     // Path to the rollback script
     const scriptPath = path.join(process.cwd(), 'scripts', 'rollback_model.py');
     
     return new Promise<NextResponse>((resolve) => {
       // Run the Python rollback script
-      const pythonProcess = spawn('python', [scriptPath], {
+      const pythonProcess = spawn('python', [scriptPath, version], {
         cwd: path.join(process.cwd(), 'scripts'),
         stdio: ['pipe', 'pipe', 'pipe'],
         shell: true
@@ -35,7 +46,7 @@ export async function POST(): Promise<NextResponse> {
           console.log('✅ Model rollback completed successfully');
           resolve(NextResponse.json({
             success: true,
-            message: 'Model rolled back to original version successfully',
+            message: `Model rolled back to ${version} successfully`,
             output: output,
             code: code
           }));
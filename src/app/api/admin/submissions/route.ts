@@ -1,11 +1,49 @@
 import { NextResponse } from 'next/server';
+import { PythonShell } from 'python-shell';
 import fs from 'fs';
 import path from 'path';
 
+interface NearestBeamsResult {
+  nearestBeams: Record<string, number | string>[];
+  isNearDuplicate: boolean;
+}
+
+// Look up the most similar tested beams for all pending submissions in one Python run
+async function findNearestBeams(beams: Record<string, number>[]): Promise<NearestBeamsResult[] | null> {
+  const options = {
+    mode: 'text' as const,
+    pythonPath: 'python',
+    pythonOptions: ['-u'],
+    scriptPath: path.join(process.cwd(), 'scripts'),
+  };
+
+  const pythonShell = new PythonShell('nearest_beams.py', options);
+  pythonShell.send(JSON.stringify(beams));
+
+  return new Promise((resolve) => {
+    pythonShell.on('message', (message) => {
+      try {
+        const result = JSON.parse(message);
+        resolve(result.success ? result.results : null);
+      } catch {
+        resolve(null);
+      }
+    });
+
+    pythonShell.on('error', () => resolve(null));
+
+    pythonShell.end((err) => {
+      if (err) {
+        resolve(null);
+      }
+    });
+  });
+}
+
 export async function GET() {
   try {
     const submissionsPath = path.join(process.cwd(), 'data', 'submissions.json');
-    
+
     if (!fs.existsSync(submissionsPath)) {
       return NextResponse.json({ submissions: [] });
     }
@@ -13,6 +51,18 @@ export async function GET() {
     const fileContent = fs.readFileSync(submissionsPath, 'utf-8');
     const submissions = JSON.parse(fileContent);
 
+    // Show pending submissions next to the tested beams they most resemble
+    const pending = submissions.filter((s: { status: string }) => s.status === 'pending');
+    if (pending.length > 0) {
+      const results = await findNearestBeams(pending.map((s: { beamData: Record<string, number> }) => s.beamData));
+      if (results) {
+        pending.forEach((submission: Record<string, unknown>, index: number) => {
+          submission.nearestBeams = results[index].nearestBeams;
+          submission.isNearDuplicate = results[index].isNearDuplicate;
+        });
+      }
+    }
+
     return NextResponse.json({ submissions });
 
   } catch (error) {
@@ -1,7 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { PythonShell } from 'python-shell';
 import path from 'path';
-import { beamAnalysisSchema } from '@/lib/types';
+import { beamAnalysisSchema, NearestBeam } from '@/lib/types';
 
 export async function POST(request: NextRequest) {
   try {
@@ -24,6 +24,8 @@ export async function POST(request: NextRequest) {
       da_mm: validatedData.da_mm,
       Plate_Top_mm: validatedData.Plate_Top_mm,
       Plate_Bottom_mm: validatedData.Plate_Bottom_mm,
+      // Optional registered model version; the current version is used when omitted
+      ...(typeof body.version === 'string' ? { version: body.version } : {}),
     };
     
     // Get the path to the Python script
@@ -41,7 +43,7 @@ export async function POST(request: NextRequest) {
     const pythonShell = new PythonShell(path.basename(scriptPath), options);
     pythonShell.send(JSON.stringify(inputData));
     
-    const pythonResults = await new Promise<{ shearStrength: number; confidence: number; success?: boolean; error?: string }>((resolve, reject) => {
+    const pythonResults = await new Promise<{ shearStrength: number; confidence: number; nearestBeams?: NearestBeam[]; version?: string; success?: boolean; error?: string }>((resolve, reject) => {
       pythonShell.on('message', (message) => {
         try {
           const result = JSON.parse(message);
@@ -78,6 +80,8 @@ export async function POST(request: NextRequest) {
       success: true,
       shearStrength: pythonResults.shearStrength,
       confidence: pythonResults.confidence,
+      nearestBeams: pythonResults.nearestBeams,
+      version: pythonResults.version,
       timestamp: new Date().toISOString(),
       inputData: validatedData
     });
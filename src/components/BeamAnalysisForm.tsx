@@ -63,6 +63,7 @@ export const BeamAnalysisForm: React.FC = () => {
       const analysisResult: AnalysisResult = {
         shearStrength: result.shearStrength,
         confidence: result.confidence,
+        nearestBeams: result.nearestBeams,
         timestamp: result.timestamp,
         inputData: data
       };
@@ -375,6 +375,44 @@ export const EnhancedResultsDisplay: React.FC<EnhancedResultsDisplayProps> = ({
         </div>
       </div>
 
+      {/* Nearest Tested Beams */}
+      {result.nearestBeams && result.nearestBeams.length > 0 && (
+        <div className="bg-white dark:bg-gray-800 rounded-xl shadow-lg border border-gray-200 dark:border-gray-700 p-6">
+          <h3 className="text-lg font-semibold text-gray-900 dark:text-white mb-4 flex items-center gap-2">
+            <Target className="h-5 w-5 text-blue-600" />
+            Most Similar Tested Beams
+          </h3>
+          <div className="overflow-x-auto">
+            <table className="w-full text-sm">
+              <thead>
+                <tr className="text-left text-gray-600 dark:text-gray-400 border-b border-gray-200 dark:border-gray-700">
+                  <th className="py-2 pr-4">Beam</th>
+                  <th className="py-2 pr-4">h (mm)</th>
+                  <th className="py-2 pr-4">b (mm)</th>
+                  <th className="py-2 pr-4">a/d</th>
+                  <th className="py-2 pr-4">fck (MPa)</th>
+                  <th className="py-2 pr-4">Tested V (kN)</th>
+                  <th className="py-2">Distance</th>
+                </tr>
+              </thead>
+              <tbody>
+                {result.nearestBeams.map((beam, index) => (
+                  <tr key={`nearest-${index}`} className="border-b border-gray-100 dark:border-gray-700 text-gray-900 dark:text-white">
+                    <td className="py-2 pr-4">{beam.Beam_Number ?? '-'}</td>
+                    <td className="py-2 pr-4">{beam.h_mm}</td>
+                    <td className="py-2 pr-4">{beam.b_mm}</td>
+                    <td className="py-2 pr-4">{beam.abyd.toFixed(2)}</td>
+                    <td className="py-2 pr-4">{beam.fck_Mpa}</td>
+                    <td className="py-2 pr-4 font-medium">{beam.V_Kn.toFixed(1)}</td>
+                    <td className="py-2">{beam.distance.toFixed(3)}</td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </div>
+      )}
+
       {/* Input Summary */}
       <div className="bg-white dark:bg-gray-800 rounded-xl shadow-lg border border-gray-200 dark:border-gray-700 p-6">
         <h3 className="text-lg font-semibold text-gray-900 dark:text-white mb-4 flex items-center gap-2">
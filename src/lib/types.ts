@@ -16,9 +16,17 @@ export const beamAnalysisSchema = z.object({
 
 export type BeamAnalysisFormData = z.infer<typeof beamAnalysisSchema>;
 
+export interface NearestBeam extends BeamAnalysisFormData {
+  V_Kn: number;
+  source: string;
+  distance: number;
+  Beam_Number?: number;
+}
+
 export interface AnalysisResult {
   shearStrength?: number;
   confidence?: number;
+  nearestBeams?: NearestBeam[];
   timestamp: string;
   inputData: BeamAnalysisFormData;
   success?: boolean;